@@ -0,0 +1,287 @@
+import argparse
+import csv
+import glob
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import IMAGE_SIZE, CLASSES, decode_image
+from series_inference import SLICE_EXTENSIONS
+
+FIELDS = ['path', 'prediction', 'confidence', 'stage'] + [f'prob_{c}' for c in CLASSES] + ['error', 'model_version']
+
+
+def iter_image_paths(root):
+    """Yield image paths under root, relative to it, in a stable order"""
+    for dirpath, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(SLICE_EXTENSIONS) and not name.startswith('.'):
+                yield os.path.relpath(os.path.join(dirpath, name), root)
+
+
+def _decode(root, rel_path):
+    """Process-pool task: decode one image to uint8 with the backend's preprocessing"""
+    try:
+        with Image.open(os.path.join(root, rel_path)) as img:
+            return rel_path, decode_image(img), None
+    except Exception as e:
+        return rel_path, None, str(e)
+
+
+class CsvResultWriter:
+    """Append rows to a CSV file, flushing after every batch.
+
+    Every row is a single line, so a row cut short by an interrupted run is
+    whatever follows the last newline; it is ignored and truncated on resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _complete_bytes(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        return data[:data.rfind(b'\n') + 1]
+
+    def _rows(self):
+        if not os.path.exists(self.path):
+            return []
+        text = self._complete_bytes().decode('utf-8')
+        # Rows with missing trailing fields were not fully written
+        return [row for row in csv.DictReader(io.StringIO(text, newline='')) if row['error'] is not None]
+
+    def done_paths(self):
+        return {row['path'] for row in self._rows()}
+
+    def model_versions(self):
+        # Files written before the column existed report None
+        return {row.get('model_version') for row in self._rows()}
+
+    def open(self):
+        if os.path.exists(self.path):
+            complete = len(self._complete_bytes())
+            if complete < os.path.getsize(self.path):
+                with open(self.path, 'rb+') as f:
+                    f.truncate(complete)
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if is_new:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """Write each batch as a part file inside a dataset directory"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, 'part-*.parquet')))
+
+    def done_paths(self):
+        import pyarrow.parquet as pq
+        done = set()
+        for part in self._parts():
+            done.update(pq.read_table(part, columns=['path']).column('path').to_pylist())
+        return done
+
+    def model_versions(self):
+        import pyarrow.parquet as pq
+        versions = set()
+        for part in self._parts():
+            if 'model_version' not in pq.read_schema(part).names:
+                versions.add(None)
+            else:
+                versions.update(pq.read_table(part, columns=['model_version']).column('model_version').to_pylist())
+        return versions
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._next_part = len(self._parts())
+
+    def write(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pylist(rows, schema=pa.schema(
+            [('path', pa.string()), ('prediction', pa.string()), ('confidence', pa.float64()),
+             ('stage', pa.string())] +
+            [(f'prob_{c}', pa.float64()) for c in CLASSES] +
+            [('error', pa.string()), ('model_version', pa.string())]
+        ))
+        # Write to a temporary name first so an interrupted write never leaves a half part
+        part = os.path.join(self.path, f'part-{self._next_part:06d}.parquet')
+        pq.write_table(table, part + '.tmp')
+        os.replace(part + '.tmp', part)
+        self._next_part += 1
+
+    def close(self):
+        pass
+
+
+def _result_rows(paths, probs, escalated, model_version):
+    rows = []
+    for path, p, esc in zip(paths, probs, escalated):
+        row = {
+            'path': path,
+            'prediction': CLASSES[int(np.argmax(p))],
+            'confidence': round(float(np.max(p) * 100), 2),
+            'stage': 'full' if esc else 'screen',
+            'error': '',
+            'model_version': model_version
+        }
+        row.update({f'prob_{c}': float(v) for c, v in zip(CLASSES, p)})
+        rows.append(row)
+    return rows
+
+
+def _error_row(path, error, model_version):
+    row = {f: '' for f in FIELDS}
+    # Keep every CSV row on one line so partial rows can be found after a crash
+    row.update({'path': path, 'error': ' '.join(error.split()), 'confidence': None, 'model_version': model_version})
+    row.update({f'prob_{c}': None for c in CLASSES})
+    return row
+
+
+def _inference_worker(version, batches, writer, stats):
+    """Single consumer: run each batch through the model and append its results"""
+    while True:
+        item = batches.get()
+        if item is None:
+            return
+        if stats['exception'] is not None:
+            continue  # keep draining so the producer never blocks
+        paths, batch, errors = item
+        try:
+            rows = [_error_row(p, e, version.version_id) for p, e in errors]
+            if paths:
+                probs, escalated = version.predict(batch)
+                rows.extend(_result_rows(paths, probs, escalated, version.version_id))
+            writer.write(rows)
+        except Exception as e:
+            stats['exception'] = e
+            continue
+        stats['scored'] += len(paths)
+        stats['failed'] += len(errors)
+
+
+def score_directory(root, output, version, batch_size=64, workers=None, report_every=10):
+    """Classify every image under root, appending results to output (resumable)"""
+    writer = ParquetResultWriter(output) if output.endswith('.parquet') else CsvResultWriter(output)
+    # Resuming with another model, screening model or threshold would mix two models' results
+    other_versions = writer.model_versions() - {version.version_id}
+    if other_versions:
+        recorded = ', '.join(sorted(v or 'unrecorded' for v in other_versions))
+        raise ValueError(f"{output} holds results from a different model ({recorded}); "
+                         f"current model is {version.version_id}. Use a new --output.")
+    done = writer.done_paths()
+    todo = [p for p in iter_image_paths(root) if p not in done]
+    print(f"Found {len(todo) + len(done)} images, {len(done)} already scored, {len(todo)} to go")
+    if not todo:
+        return
+
+    writer.open()
+    stats = {'scored': 0, 'failed': 0, 'exception': None}
+    # Small bound so decoded batches never pile up ahead of the model
+    batches = queue.Queue(maxsize=2)
+    consumer = threading.Thread(target=_inference_worker, args=(version, batches, writer, stats), daemon=True)
+    consumer.start()
+
+    start = time.perf_counter()
+    n_batches = 0
+    try:
+        # Spawned, not forked: the parent already holds a multithreaded TensorFlow runtime
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            # Keep a bounded window of decode tasks in flight, consumed in submission order
+            window = deque()
+            paths_iter = iter(todo)
+            max_in_flight = 4 * batch_size
+
+            def fill():
+                for rel_path in paths_iter:
+                    window.append(pool.submit(_decode, root, rel_path))
+                    if len(window) >= max_in_flight:
+                        break
+
+            fill()
+            while window:
+                buffer = np.empty((batch_size, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32)
+                paths, errors = [], []
+                while window and len(paths) + len(errors) < batch_size:
+                    rel_path, pixels, error = window.popleft().result()
+                    if error is None:
+                        buffer[len(paths)] = pixels
+                        paths.append(rel_path)
+                    else:
+                        errors.append((rel_path, error))
+                fill()
+
+                buffer = buffer[:len(paths)]
+                buffer /= 255.0
+                batches.put((paths, buffer, errors))
+                n_batches += 1
+                if stats['exception'] is not None:
+                    break
+
+                if n_batches % report_every == 0:
+                    elapsed = time.perf_counter() - start
+                    processed = stats['scored'] + stats['failed']
+                    print(f"  {processed}/{len(todo)} images  {processed / elapsed:.1f} img/s")
+    finally:
+        batches.put(None)
+        consumer.join()
+        writer.close()
+
+    if stats['exception'] is not None:
+        raise RuntimeError(f"Inference failed; rerun to resume: {stats['exception']}") from stats['exception']
+
+    elapsed = time.perf_counter() - start
+    total = stats['scored'] + stats['failed']
+    print(f"✅ Scored {stats['scored']} images ({stats['failed']} unreadable) in {elapsed:.1f}s "
+          f"→ {total / elapsed:.1f} images/sec")
+
+
+def main():
+    # Imported here so spawned decoder processes, which re-import this module, never load TensorFlow
+    from model_registry import load_version
+    from cascade import DEFAULT_THRESHOLD
+
+    parser = argparse.ArgumentParser(description="Offline batch classification of an MRI image archive")
+    parser.add_argument('root', help="Directory tree containing JPG/PNG/TIFF scans")
+    parser.add_argument('--output', default='predictions.csv',
+                        help="CSV file, or a .parquet dataset directory; existing results are skipped")
+    parser.add_argument('--model', default=os.environ.get(
+        "MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_model.h5")))
+    parser.add_argument('--screen-model', default=os.environ.get("SCREEN_MODEL_PATH"))
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.environ.get("CASCADE_THRESHOLD", DEFAULT_THRESHOLD)))
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, help="Decoder processes (default: CPU count)")
+    args = parser.parse_args()
+
+    version = load_version(args.model, args.screen_model, args.threshold)
+    try:
+        score_directory(args.root, args.output, version, batch_size=args.batch_size, workers=args.workers)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from preprocessing import CLASSES, load_image
+from series_inference import SLICE_EXTENSIONS
+
+# Screening confidence (0-1) above which the fast model's answer is returned directly
+DEFAULT_THRESHOLD = 0.90
+
+
+def build_screening_model(input_shape=(224, 224, 3), num_classes=len(CLASSES)):
+    """Build the small CNN used as the first stage of the cascade.
+
+    Train it on the same generators as the DenseNet121 model in the notebook
+    and save it next to saved_model.h5 (e.g. screen_model.h5).
+    """
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=input_shape),
+        tf.keras.layers.Conv2D(16, 3, strides=2, padding='same', activation='relu'),
+        tf.keras.layers.MaxPooling2D(),
+        tf.keras.layers.Conv2D(32, 3, padding='same', activation='relu'),
+        tf.keras.layers.MaxPooling2D(),
+        tf.keras.layers.Conv2D(64, 3, padding='same', activation='relu'),
+        tf.keras.layers.MaxPooling2D(),
+        tf.keras.layers.Conv2D(128, 3, padding='same', activation='relu'),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(num_classes, activation='softmax')
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(1e-3),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+class CascadeClassifier:
+    """Screen images with a fast model and escalate uncertain ones to the full model"""
+
+    def __init__(self, screen_model, full_model, threshold=DEFAULT_THRESHOLD):
+        self.screen_model = screen_model
+        self.full_model = full_model
+        self.threshold = threshold
+
+    def predict(self, batch):
+        """Return (probabilities, escalated) for a preprocessed batch.
+
+        `escalated` is a boolean array marking the rows answered by the full model.
+        """
+        probs = np.asarray(self.screen_model.predict(batch, verbose=0), dtype=np.float32)
+        escalated = probs.max(axis=1) < self.threshold
+
+        if escalated.any():
+            full_probs = self.full_model.predict(batch[escalated], verbose=0)
+            probs[escalated] = full_probs
+
+        return probs, escalated
+
+
+def calibrate_threshold(screen_probs, labels, target_accuracy):
+    """Pick the lowest threshold at which the screen model's early exits reach target_accuracy.
+
+    Returns None if no threshold achieves the target.
+    """
+    confidence = screen_probs.max(axis=1)
+    correct = screen_probs.argmax(axis=1) == labels
+
+    # Walk candidates from most to least confident; accuracy of the exited set
+    # at each cut-off is the running mean of `correct`
+    order = np.argsort(-confidence)
+    sorted_conf = confidence[order]
+    running_acc = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+
+    # Only cut between distinct confidence values so tied scans exit together
+    boundary = np.append(sorted_conf[1:] != sorted_conf[:-1], True)
+    passing = np.nonzero(boundary & (running_acc >= target_accuracy))[0]
+    if len(passing) == 0:
+        return None
+    return float(sorted_conf[passing[-1]])
+
+
+def evaluate_cascade(screen_probs, full_probs, labels, threshold):
+    """Report exit rate and accuracy delta of the cascade against the full model alone"""
+    exited = screen_probs.max(axis=1) >= threshold
+    cascade_probs = np.where(exited[:, None], screen_probs, full_probs)
+
+    full_acc = float(np.mean(full_probs.argmax(axis=1) == labels))
+    cascade_acc = float(np.mean(cascade_probs.argmax(axis=1) == labels))
+
+    return {
+        'threshold': threshold,
+        'samples': int(len(labels)),
+        'exit_rate': float(np.mean(exited)),
+        'full_accuracy': full_acc,
+        'cascade_accuracy': cascade_acc,
+        'accuracy_delta': cascade_acc - full_acc
+    }
+
+
+def _labelled_paths(data_dir):
+    """(path, label) for every image in a class-per-folder directory, classes in sorted folder order"""
+    class_names = sorted(d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)))
+    samples = []
+    for label, class_name in enumerate(class_names):
+        for root, dirs, files in os.walk(os.path.join(data_dir, class_name)):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SLICE_EXTENSIONS) and not name.startswith('.'):
+                    samples.append((os.path.join(root, name), label))
+    return samples
+
+
+def _predict_directory(model, data_dir, batch_size):
+    """Run a model over a class-per-folder directory, returning (probs, labels).
+
+    Images go through the same preprocessing as main.py, so the confidences a
+    threshold is calibrated on match the ones it controls when serving.
+    """
+    samples = _labelled_paths(data_dir)
+    if not samples:
+        raise ValueError(f"No images found in {data_dir}")
+
+    probs = []
+    for start in range(0, len(samples), batch_size):
+        batch = np.stack([load_image(path) for path, _ in samples[start:start + batch_size]])
+        probs.append(model.predict(batch, verbose=0))
+    labels = np.array([label for _, label in samples])
+    return np.concatenate(probs).astype(np.float32), labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate and evaluate the two-stage cascade")
+    parser.add_argument('--screen-model', required=True, help="Path to the fast screening model")
+    parser.add_argument('--full-model', required=True, help="Path to the full DenseNet121 model")
+    parser.add_argument('--test-dir', required=True, help="Directory with one sub-folder per class")
+    parser.add_argument('--calib-dir', help="Held-out directory used to calibrate the threshold")
+    parser.add_argument('--threshold', type=float, help="Use this threshold instead of calibrating")
+    parser.add_argument('--target-accuracy', type=float, default=0.95,
+                        help="Required accuracy on early-exited scans when calibrating")
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    # Calibrating on the test set would bias the reported accuracy delta
+    if args.threshold is None and args.calib_dir is None:
+        parser.error("--calib-dir (a held-out set, not the test set) is required unless --threshold is given")
+
+    screen_model = tf.keras.models.load_model(args.screen_model)
+    full_model = tf.keras.models.load_model(args.full_model)
+
+    threshold = args.threshold
+    if threshold is None:
+        calib_probs, calib_labels = _predict_directory(screen_model, args.calib_dir, args.batch_size)
+        threshold = calibrate_threshold(calib_probs, calib_labels, args.target_accuracy)
+        if threshold is None:
+            print(f"⚠️ No threshold reaches {args.target_accuracy:.2%} accuracy; every scan would be escalated.")
+            threshold = 1.01
+        else:
+            print(f"Calibrated threshold: {threshold:.4f}")
+
+    screen_probs, labels = _predict_directory(screen_model, args.test_dir, args.batch_size)
+    full_probs, _ = _predict_directory(full_model, args.test_dir, args.batch_size)
+    report = evaluate_cascade(screen_probs, full_probs, labels, threshold)
+
+    print(f"Samples           : {report['samples']}")
+    print(f"Threshold         : {report['threshold']:.4f}")
+    print(f"Exit rate         : {report['exit_rate'] * 100:.2f}%")
+    print(f"Full accuracy     : {report['full_accuracy'] * 100:.2f}%")
+    print(f"Cascade accuracy  : {report['cascade_accuracy'] * 100:.2f}%")
+    print(f"Accuracy delta    : {report['accuracy_delta'] * 100:+.2f} pts")
+    print(f"\nSet CASCADE_THRESHOLD={threshold:.4f} to use this threshold in main.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,23 @@
 from src.nlp_processor import NLPProcessor
 from src.knowledge_base_manager import KnowledgeBaseManager
+from src.embedding_store import EmbeddingStore
 import numpy as np
+import os
 
 class ChatbotEngine:
-    def __init__(self, similarity_threshold=0.5):
+    def __init__(self, similarity_threshold=0.5, embedding_dtype=None):
         print("Initializing Chatbot Engine...")
         self.nlp = NLPProcessor()
         self.kb_manager = KnowledgeBaseManager()
         self.similarity_threshold = similarity_threshold
+        # float32, float16 or int8 storage for question embeddings
+        self.embedding_dtype = embedding_dtype or os.environ.get('KB_EMBEDDING_DTYPE', 'float32')
         
         # Precompute embeddings for all questions
-        self.question_embeddings = {}
+        self.questions = []
+        self.embedding_store = None
         self._precompute_embeddings()
-        print(f"✅ Chatbot ready! Loaded {len(self.question_embeddings)} questions.")
+        print(f"✅ Chatbot ready! Loaded {len(self.questions)} questions.")
     
     def _precompute_embeddings(self):
         """Precompute embeddings for all questions in KB"""
@@ -21,45 +26,50 @@ class ChatbotEngine:
             print("⚠️ Warning: No questions found in knowledge base!")
             return
             
-        for q in questions:
-            question_text = q['question']
-            self.question_embeddings[q['id']] = self.nlp.get_embedding(question_text)
+        # One contiguous (optionally quantized) matrix, rows aligned with self.questions
+        self.questions = list(questions)
+        embeddings = self.nlp.get_embeddings(q['question'] for q in self.questions)
+        self.embedding_store = EmbeddingStore([q['id'] for q in self.questions], embeddings,
+                                              dtype=self.embedding_dtype)
+    
+    def _match_scores(self, scores):
+        """Best matching question and score from similarities against every question"""
+        best_idx = int(np.argmax(scores))
+        best_score = float(scores[best_idx])
+        if best_score <= 0:
+            return None, 0.0
+        best_match = self.questions[best_idx]
+        
+        # Return match if above threshold
+        if best_score >= self.similarity_threshold:
+            return best_match, best_score
+        else:
+            return None, best_score
     
     def find_best_match(self, user_query):
         """Find the best matching question from knowledge base"""
-        if not self.question_embeddings:
+        if not self.questions:
             return None, 0.0
             
         # Clean user query
         cleaned_query = self.nlp.clean_text(user_query)
         query_embedding = self.nlp.get_embedding(cleaned_query)
         
-        best_match = None
-        best_score = 0
-        
-        # Calculate similarity with all questions
-        for q in self.kb_manager.get_all_questions():
-            q_embedding = self.question_embeddings[q['id']]
-            
-            # Calculate cosine similarity
-            similarity = np.dot(query_embedding, q_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(q_embedding)
-            )
-            
-            if similarity > best_score:
-                best_score = similarity
-                best_match = q
-        
-        # Return match if above threshold
-        if best_score >= self.similarity_threshold:
-            return best_match, best_score
-        else:
-            return None, best_score
+        # Cosine similarity with all questions, scored on the stored embeddings
+        return self._match_scores(self.embedding_store.scores(query_embedding))
     
-    def get_response(self, user_query):
-        """Get chatbot response for user query"""
-        match, score = self.find_best_match(user_query)
+    def find_best_matches(self, user_queries):
+        """Find best matches for several queries with a single encoder call"""
+        if not self.questions:
+            return [(None, 0.0) for _ in user_queries]
         
+        cleaned_queries = [self.nlp.clean_text(q) for q in user_queries]
+        query_embeddings = self.nlp.get_embeddings(cleaned_queries)
+        scores = self.embedding_store.scores_batch(query_embeddings)
+        return [self._match_scores(row) for row in scores]
+    
+    def _build_response(self, match, score):
+        """Format a match as the chatbot response dict"""
         if match:
             return {
                 'answer': match['answer'],
@@ -73,4 +83,14 @@ class ChatbotEngine:
                 'confidence': round(score * 100, 2),
                 'category': 'unknown',
                 'matched': False
-            }
\ No newline at end of file
+            }
+    
+    def get_response(self, user_query):
+        """Get chatbot response for user query"""
+        match, score = self.find_best_match(user_query)
+        return self._build_response(match, score)
+    
+    def get_responses(self, user_queries):
+        """Get chatbot responses for a batch of queries"""
+        return [self._build_response(match, score)
+                for match, score in self.find_best_matches(user_queries)]
\ No newline at end of file
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.encoder_backends import ENCODER_BACKENDS
+
+QUICK_QUESTIONS = [
+    "What is a brain tumor?",
+    "What are the symptoms?",
+    "What is glioma?",
+    "What is meningioma?",
+    "What is a pituitary tumor?",
+    "How are tumors diagnosed?",
+    "What are treatment options?",
+    "Can I upload my MRI?"
+]
+
+
+def build_queries(questions, extra_path=None):
+    """Retrieval queries: sidebar quick questions, keyword queries and truncated KB questions"""
+    queries = list(QUICK_QUESTIONS)
+    for q in questions:
+        if q.get('keywords'):
+            queries.append(' '.join(q['keywords']))
+        words = q['question'].split()
+        if len(words) > 3:
+            queries.append(' '.join(words[:max(3, len(words) // 2)]))
+    if extra_path:
+        with open(extra_path, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip())
+    return queries
+
+
+def top1_matches(encoder, questions, queries):
+    """Best-matching knowledge base id and cosine score for each query under one encoder backend"""
+    kb_matrix = np.asarray(encoder.encode([q['question'] for q in questions]), dtype=np.float32)
+    kb_matrix /= np.linalg.norm(kb_matrix, axis=1, keepdims=True)
+    query_matrix = np.asarray(encoder.encode(list(queries)), dtype=np.float32)
+    query_matrix /= np.linalg.norm(query_matrix, axis=1, keepdims=True)
+
+    scores = query_matrix @ kb_matrix.T
+    best = scores.argmax(axis=1)
+    return [questions[i]['id'] for i in best], scores[np.arange(len(best)), best].tolist()
+
+
+def _rss_mb():
+    """Peak resident memory of this process in MB"""
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module; psutil reports the peak working set instead
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(backend, kb_path, queries_path, repeats):
+    """Measure one backend in this process and print a JSON report"""
+    from src.nlp_processor import NLPProcessor
+    from src.knowledge_base_manager import KnowledgeBaseManager
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    nlp = NLPProcessor(encoder_backend=backend)
+    load_seconds = time.perf_counter() - start
+    # Read before any encoding so the figure covers loading the model only
+    rss_load_delta = _rss_mb() - rss_before
+
+    questions = KnowledgeBaseManager(kb_path).get_all_questions()
+    if not questions:
+        raise SystemExit("Knowledge base is empty; nothing to compare")
+
+    queries = [nlp.clean_text(q) for q in build_queries(questions, queries_path)]
+    top1_ids, top1_scores = top1_matches(nlp.encoder, questions, queries)
+
+    # Single-query latency, as in ChatbotEngine.find_best_match
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            t0 = time.perf_counter()
+            nlp.get_embedding(query)
+            latencies.append(time.perf_counter() - t0)
+
+    latencies_ms = np.array(latencies) * 1000
+    print(json.dumps({
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'rss_mb': _rss_mb(),
+        'rss_load_delta_mb': rss_load_delta,
+        'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+        'latency_p95_ms': float(np.percentile(latencies_ms, 95)),
+        'num_queries': len(queries),
+        'top1_ids': top1_ids,
+        'top1_scores': top1_scores
+    }))
+
+
+def measure(backend, args):
+    """Run a backend in a fresh interpreter so RSS figures are not shared"""
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', backend,
+           '--kb-path', args.kb_path, '--repeats', str(args.repeats)]
+    if args.queries:
+        cmd += ['--queries', args.queries]
+    output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    # The report is the last line; earlier lines are model loading messages
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sentence-encoder backends on knowledge base retrieval")
+    parser.add_argument('--baseline', default='sentence-transformers', choices=list(ENCODER_BACKENDS))
+    parser.add_argument('--candidate', default='onnx-int8', choices=list(ENCODER_BACKENDS))
+    parser.add_argument('--kb-path', default='data/knowledge_base.json')
+    parser.add_argument('--queries', help="Optional file with one extra query per line")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help="Fail if top-1 agreement falls below this fraction")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.kb_path, args.queries, args.repeats)
+        return
+
+    base = measure(args.baseline, args)
+    cand = measure(args.candidate, args)
+
+    agree = np.mean([a == b for a, b in zip(base['top1_ids'], cand['top1_ids'])])
+    score_delta = np.abs(np.array(base['top1_scores']) - np.array(cand['top1_scores']))
+
+    print(f"{'':<22}{base['backend']:>22}{cand['backend']:>22}")
+    for key, label in [('load_seconds', 'Load time (s)'),
+                       ('rss_mb', 'Peak RSS (MB)'),
+                       ('rss_load_delta_mb', 'Peak RSS load (+MB)'),
+                       ('latency_p50_ms', 'Latency p50 (ms)'),
+                       ('latency_p95_ms', 'Latency p95 (ms)')]:
+        print(f"{label:<22}{base[key]:>22.2f}{cand[key]:>22.2f}")
+
+    print(f"\nQueries               : {base['num_queries']}")
+    print(f"Top-1 agreement       : {agree * 100:.2f}%")
+    print(f"Top-1 score |delta|   : mean {score_delta.mean():.4f}, max {score_delta.max():.4f}")
+
+    if agree < args.min_agreement:
+        print(f"❌ Parity check failed (< {args.min_agreement * 100:.0f}% agreement)")
+        sys.exit(1)
+    print("✅ Parity check passed")
+
+
+if __name__ == "__main__":
+    main()
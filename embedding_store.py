@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+STORE_DTYPES = ('float32', 'float16', 'int8')
+
+
+class EmbeddingStore:
+    """Contiguous matrix of L2-normalised embeddings with optional quantization.
+
+    float16 halves memory; int8 quarters it and keeps one float32 scale per
+    row. Scoring does not run on the quantized values directly: NumPy has no
+    fast float16 or int8 matmul, so quantized stores are dequantized
+    `block_rows` rows at a time to float32 (int8 scales are multiplied in
+    after the product). Both are memory savings that cost query time, float16
+    several times and int8 somewhat; `compare_with_float32` reports the
+    per-query time of each dtype.
+    """
+
+    def __init__(self, ids, embeddings, dtype='float32', block_rows=4096):
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{dtype}'. Choose from: {', '.join(STORE_DTYPES)}")
+        self.ids = list(ids)
+        self.dtype = dtype
+        self.block_rows = block_rows
+
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(self.ids), -1)
+        # Normalise once so cosine similarity becomes a plain dot product
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.clip(norms, 1e-12, None)
+
+        self.scales = None
+        if dtype == 'int8':
+            scales = np.abs(matrix).max(axis=1, keepdims=True) / 127.0
+            scales = np.clip(scales, 1e-12, None).astype(np.float32)
+            self.data = np.ascontiguousarray(np.round(matrix / scales).astype(np.int8))
+            self.scales = scales.ravel()
+        else:
+            self.data = np.ascontiguousarray(matrix.astype(dtype))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.data.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores_batch(self, queries):
+        """Cosine similarity of each query (rows) against every stored embedding"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+
+        out = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), self.block_rows):
+            end = start + self.block_rows
+            block = self.data[start:end].astype(np.float32, copy=False)
+            out[:, start:end] = queries @ block.T
+            if self.scales is not None:
+                out[:, start:end] *= self.scales[start:end]
+        return out
+
+    def scores(self, query):
+        """Cosine similarity of a single query against every stored embedding"""
+        return self.scores_batch(query)[0]
+
+
+def dict_nbytes(embeddings):
+    """Memory held by a dict of separate float32 arrays, including per-object overhead"""
+    total = sys.getsizeof(embeddings)
+    for k, v in embeddings.items():
+        # getsizeof only counts the data buffer for arrays that own it
+        total += sys.getsizeof(k) + sys.getsizeof(v) + (v.nbytes if v.base is not None else 0)
+    return total
+
+
+def _ms_per_query(store, queries, max_queries=200):
+    """Mean time to score one query, as the chatbot does per message"""
+    queries = queries[:max_queries]
+    start = time.perf_counter()
+    for query in queries:
+        store.scores(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def compare_with_float32(ids, embeddings, queries, dtypes=STORE_DTYPES):
+    """Memory use, top-1 agreement and scoring time of each store dtype against float32 dict scoring"""
+    as_dict = {i: np.array(e, dtype=np.float32) for i, e in zip(ids, embeddings)}
+    reference = EmbeddingStore(ids, embeddings, 'float32').scores_batch(queries)
+    reference_top1 = reference.argmax(axis=1)
+
+    report = {'dict_bytes': dict_nbytes(as_dict), 'stores': {}}
+    for dtype in dtypes:
+        store = EmbeddingStore(ids, embeddings, dtype)
+        scores = store.scores_batch(queries)
+        top1 = scores.argmax(axis=1)
+        report['stores'][dtype] = {
+            'bytes': store.nbytes,
+            'top1_agreement': float(np.mean(top1 == reference_top1)),
+            'max_score_error': float(np.abs(scores - reference).max()),
+            'ms_per_query': _ms_per_query(store, np.asarray(queries, dtype=np.float32))
+        }
+    return report
+
+
+def _print_report(report):
+    dict_bytes = report['dict_bytes']
+    print(f"dict of float32 arrays : {dict_bytes / 1024 / 1024:10.2f} MB")
+    for dtype, r in report['stores'].items():
+        saved = 1 - r['bytes'] / dict_bytes
+        print(f"store ({dtype:<7})        : {r['bytes'] / 1024 / 1024:10.2f} MB  "
+              f"saved {saved * 100:5.1f}%  top-1 agreement {r['top1_agreement'] * 100:6.2f}%  "
+              f"max score error {r['max_score_error']:.4f}  {r['ms_per_query']:.2f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and accuracy report for quantized knowledge base embeddings")
+    parser.add_argument('--kb-path', default='data/knowledge_base.json')
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="Also report on N random 384-d embeddings to show behaviour at scale")
+    args = parser.parse_args()
+
+    # Add parent directory to path
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from src.nlp_processor import NLPProcessor
+    from src.knowledge_base_manager import KnowledgeBaseManager
+    from src.compare_encoders import build_queries
+
+    questions = KnowledgeBaseManager(args.kb_path).get_all_questions()
+    if questions:
+        nlp = NLPProcessor()
+        embeddings = nlp.get_embeddings(q['question'] for q in questions)
+        queries = nlp.get_embeddings(nlp.clean_text(q) for q in build_queries(questions))
+        print(f"Knowledge base: {len(questions)} questions, {len(queries)} queries")
+        _print_report(compare_with_float32([q['id'] for q in questions], embeddings, queries))
+    else:
+        print("⚠️ Warning: No questions found in knowledge base!")
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((args.synthetic, 384)).astype(np.float32)
+        # Queries are noisy copies of stored rows, like paraphrased questions
+        picks = rng.integers(0, args.synthetic, size=1000)
+        queries = embeddings[picks] + 0.5 * rng.standard_normal((1000, 384)).astype(np.float32)
+        print(f"\nSynthetic: {args.synthetic} embeddings, 1000 queries")
+        _print_report(compare_with_float32(range(args.synthetic), embeddings, queries))
+
+
+if __name__ == "__main__":
+    main()
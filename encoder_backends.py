@@ -0,0 +1,147 @@
+import argparse
+import os
+
+import numpy as np
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+HF_MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'minilm-onnx-int8')
+ONNX_MODEL_FILE = 'model_int8.onnx'
+
+
+class SentenceTransformerEncoder:
+    """Default backend: PyTorch SentenceTransformer"""
+
+    name = 'sentence-transformers'
+
+    def __init__(self, model_name=MODEL_NAME):
+        # Imported here so the ONNX backend never pulls in torch
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts):
+        return self.model.encode(texts)
+
+
+class OnnxInt8Encoder:
+    """int8-quantized ONNX export of all-MiniLM-L6-v2 running on onnxruntime.
+
+    Reproduces the SentenceTransformer pipeline (mean pooling over the
+    attention mask followed by L2 normalisation), so embeddings are
+    interchangeable with the default backend. Create the model files with
+    `python encoder_backends.py export`.
+    """
+
+    name = 'onnx-int8'
+
+    def __init__(self, model_dir=DEFAULT_ONNX_DIR, max_length=256, num_threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found. Run `python encoder_backends.py export` first."
+            )
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'token_type_ids': np.zeros_like(input_ids)
+        }
+        feeds = {k: v for k, v in feeds.items() if k in self.input_names}
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalise
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        embeddings = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        embeddings = embeddings.astype(np.float32)
+
+        return embeddings[0] if single else embeddings
+
+
+ENCODER_BACKENDS = {
+    SentenceTransformerEncoder.name: SentenceTransformerEncoder,
+    OnnxInt8Encoder.name: OnnxInt8Encoder
+}
+
+
+def get_encoder(name=None):
+    """Create the encoder backend selected by name or NLP_ENCODER_BACKEND"""
+    name = name or os.environ.get('NLP_ENCODER_BACKEND', SentenceTransformerEncoder.name)
+    if name not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{name}'. Choose from: {', '.join(ENCODER_BACKENDS)}")
+    return ENCODER_BACKENDS[name]()
+
+
+def export_onnx_encoder(output_dir=DEFAULT_ONNX_DIR, model_id=HF_MODEL_ID):
+    """Export all-MiniLM-L6-v2 to ONNX and quantize its weights to int8"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, 'model_fp32.onnx')
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+
+    print(f"Exporting {model_id} to ONNX...")
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id).eval()
+    dummy = tokenizer(["brain tumor symptoms"], return_tensors='pt')
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy['input_ids'], dummy['attention_mask'], dummy['token_type_ids']),
+            fp32_path,
+            input_names=['input_ids', 'attention_mask', 'token_type_ids'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'token_type_ids': {0: 'batch', 1: 'sequence'},
+                'last_hidden_state': {0: 'batch', 1: 'sequence'}
+            },
+            opset_version=14
+        )
+
+    print("Quantizing weights to int8...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    # Writes tokenizer.json used by the onnxruntime backend
+    tokenizer.save_pretrained(output_dir)
+    print(f"✅ Quantized encoder written to {output_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage sentence-encoder backends")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="Export the int8-quantized ONNX encoder")
+    export.add_argument('--output-dir', default=DEFAULT_ONNX_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_onnx_encoder(args.output_dir)
@@ -0,0 +1,207 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    filename TEXT,
+    metadata TEXT,
+    payload_path TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS results (
+    job_id TEXT PRIMARY KEY REFERENCES jobs (id),
+    result TEXT NOT NULL
+);
+"""
+
+
+class JobQueue:
+    """Persistent scan-analysis queue backed by a local SQLite database.
+
+    Uploads are spooled to files under `spool_dir` rather than stored in the
+    database. Jobs are stored in the `jobs` table and drained by worker threads
+    that call `handler(kind, payload_path, filename)`; the returned dict is kept
+    in `results` so finished analyses can be fetched again without re-running
+    inference.
+    """
+
+    def __init__(self, db_path, handler, spool_dir, num_workers=1, poll_interval=1.0, max_backoff=30.0):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.handler = handler
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers = []
+        os.makedirs(spool_dir, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Databases created before uploads were spooled to disk lack payload_path
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'payload_path' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN payload_path TEXT")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Short-lived connection that commits on success and is always closed"""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start(self):
+        """Requeue jobs a previous process left running, then start the worker threads"""
+        with self._connection() as conn:
+            conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout=None):
+        """Signal the workers to exit and wait for them"""
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, stream, kind='image', filename=None, metadata=None):
+        """Spool an uploaded file object to disk, queue it for analysis and return its job id"""
+        job_id = uuid.uuid4().hex
+        payload_path = os.path.join(self.spool_dir, job_id)
+        # Copied in chunks, so large studies never sit in memory
+        with open(payload_path, 'wb') as f:
+            shutil.copyfileobj(stream, f)
+
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, kind, status, filename, metadata, payload_path, created_at) "
+                    "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, kind, filename, json.dumps(metadata or {}), payload_path, time.time())
+                )
+        except Exception:
+            os.remove(payload_path)
+            raise
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return the stored record for a job, or None if it does not exist"""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT j.id, j.kind, j.status, j.filename, j.metadata, j.error, "
+                "j.created_at, j.started_at, j.finished_at, r.result "
+                "FROM jobs j LEFT JOIN results r ON r.job_id = j.id WHERE j.id = ?",
+                (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def _to_dict(self, row):
+        return {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'filename': row['filename'],
+            'metadata': json.loads(row['metadata'] or '{}'),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+
+    def _claim(self, conn):
+        """Atomically move the oldest queued job to running and return it"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, filename, payload_path FROM jobs "
+                "WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                    (time.time(), row['id'])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _remove_payload(self, payload_path):
+        if payload_path and os.path.exists(payload_path):
+            os.remove(payload_path)
+
+    def _run_job(self, conn, job):
+        """Run the handler for a claimed job and record its result or error"""
+        try:
+            result = self.handler(job['kind'], job['payload_path'], job['filename'])
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR REPLACE INTO results (job_id, result) VALUES (?, ?)",
+                         (job['id'], json.dumps(result)))
+            conn.execute("UPDATE jobs SET status = 'done', payload_path = NULL, finished_at = ? WHERE id = ?",
+                         (time.time(), job['id']))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f" Job {job['id']} failed: {e}")
+            conn.execute("UPDATE jobs SET status = 'error', error = ?, payload_path = NULL, finished_at = ? "
+                         "WHERE id = ?", (str(e), time.time(), job['id']))
+
+        # The uploaded scan is no longer needed once the job has finished either way
+        self._remove_payload(job['payload_path'])
+
+    def _worker_loop(self):
+        conn = self._connect()
+        conn.isolation_level = None  # explicit transactions in _claim
+        backoff = self.poll_interval
+        try:
+            while not self._stopping.is_set():
+                try:
+                    job = self._claim(conn)
+                    if job is None:
+                        self._wakeup.wait(self.poll_interval)
+                        self._wakeup.clear()
+                    else:
+                        self._run_job(conn, job)
+                    backoff = self.poll_interval
+                except Exception as e:
+                    # e.g. "database is locked"; keep the worker alive and retry later
+                    print(f" Job worker error, retrying in {backoff:.1f}s: {e}")
+                    try:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                    self._stopping.wait(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+        finally:
+            conn.close()
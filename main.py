@@ -1,35 +1,192 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import tensorflow as tf
 import numpy as np
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
+import atexit
+import hmac
+import os
+import tarfile
+import zipfile
+
+from preprocessing import CLASSES, preprocess_image
+from cascade import DEFAULT_THRESHOLD
+from model_registry import ModelRegistry, list_versions
+from series_inference import batch_size_for_memory, predict_series
+from job_queue import JobQueue
+from phash_index import PHashIndex, perceptual_hash, thumbnail
 
 app = Flask(__name__)
-CORS(app)
+# Admin responses are not readable cross-origin; the endpoints themselves require ADMIN_TOKEN
+CORS(app, resources={r"/(?!admin/).*": {"origins": "*"}})
+
+# With debug=True the Werkzeug reloader runs this module twice: a file-watching
+# parent and the serving child (WERKZEUG_RUN_MAIN=true). Only the serving
+# process loads models, runs job workers and owns the near-duplicate index.
+IS_SERVING_PROCESS = __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+
+# Model file, or a directory of model versions (the newest one is served)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.environ.get("MODEL_PATH", os.path.join(BASE_DIR, "saved_model.h5"))
+
+# Optional two-stage cascade: a small screening CNN answers confident scans,
+# uncertain ones are escalated to the full model
+SCREEN_MODEL_PATH = os.environ.get("SCREEN_MODEL_PATH")
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", DEFAULT_THRESHOLD))
+
+# Shared secret for /admin/* (sent as the X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Memory ceiling (MB) for the input batch buffer used by series prediction
+SERIES_MAX_BATCH_MB = float(os.environ.get("SERIES_MAX_BATCH_MB", 64))
+
+# Opt-in: near-duplicate uploads (re-exports, rescaled copies) can be served from
+# earlier results. Off by default (-1); a hash hit must also match a 16x16
+# thumbnail within PHASH_CONFIRM_TOLERANCE grey levels before it is reused
+PHASH_MAX_DISTANCE = int(os.environ.get("PHASH_MAX_DISTANCE", -1))
+PHASH_CONFIRM_TOLERANCE = int(os.environ.get("PHASH_CONFIRM_TOLERANCE", 2))
+PHASH_INDEX_PATH = os.environ.get("PHASH_INDEX_PATH")
+PHASH_SAVE_INTERVAL = float(os.environ.get("PHASH_SAVE_INTERVAL", 60))
+
+phash_index = PHashIndex(max_distance=PHASH_MAX_DISTANCE, num_classes=len(CLASSES),
+                         confirm_tolerance=PHASH_CONFIRM_TOLERANCE)
+if PHASH_INDEX_PATH and IS_SERVING_PROCESS:
+    phash_index.load(PHASH_INDEX_PATH)
+    phash_index.start_autosave(PHASH_INDEX_PATH, PHASH_SAVE_INTERVAL)
+    atexit.register(phash_index.save, PHASH_INDEX_PATH)
+
+
+def analyze_image(img, version):
+    """Run a single PIL image through a model version and build the API response"""
+    stage = None
+    image_hash = None
+    if PHASH_MAX_DISTANCE >= 0:
+        image_hash, image_thumb = perceptual_hash(img), thumbnail(img)
+        hit = phash_index.lookup(image_hash, image_thumb, version.version_id)
+        if hit is not None:
+            probs, distance = hit
+            stage = 'cache'
+
+    if stage is None:
+        img_array = np.expand_dims(preprocess_image(img), axis=0)
+
+        # Perform prediction
+        prediction, escalated = version.predict(img_array)
+        probs = prediction[0]
+        stage = 'full' if escalated[0] else 'screen'
+        if image_hash is not None:
+            phash_index.add(image_hash, image_thumb, probs, version.version_id)
+
+    predicted_class = CLASSES[np.argmax(probs)]
+    confidence = float(np.max(probs) * 100)
 
-# Correct model path
-MODEL_PATH = r"C:\Users\Suraj Vishwakarma\Desktop\MAJOR PROJECT\NewModel\saved_model.h5"
+    result = {
+        'prediction': predicted_class,
+        'confidence': round(confidence, 2),
+        'stage': stage,
+        'model_version': version.name
+    }
+    if stage == 'cache':
+        result['hash_distance'] = distance
+    return result
 
-# Load the model properly
-try:
-    print(" Loading model...")
-    model = tf.keras.models.load_model(MODEL_PATH)
-    print(" Model loaded successfully!")
-except Exception as e:
-    print(f" Error loading model: {e}")
-    model = None
 
-# Define labels
-CLASSES = ['glioma_tumor', 'meningioma_tumor', 'no_tumor', 'pituitary_tumor']
+def analyze_series(stream, version, aggregate='mean', include_slices=False, name='series'):
+    """Study-level prediction over a multi-slice upload, on a single model version"""
+    result = predict_series(
+        stream,
+        lambda batch: version.predict(batch)[0],
+        batch_size=batch_size_for_memory(SERIES_MAX_BATCH_MB),
+        aggregate=aggregate,
+        keep_slices=include_slices,
+        name=name
+    )
+    result['model_version'] = version.name
+    return result
+
+
+def run_job(kind, payload_path, filename):
+    """Job queue handler: analyse an upload spooled to disk"""
+    version = registry.current
+    if version is None:
+        raise RuntimeError('Model not ready')
+    if kind == 'series':
+        # Streamed from the spooled file, slice by slice
+        with open(payload_path, 'rb') as f:
+            return analyze_series(f, version, name=filename or 'series')
+    with Image.open(payload_path) as img:
+        return analyze_image(img, version)
+
+# Background analysis jobs, persisted in a local SQLite database
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", os.path.join(BASE_DIR, "jobs.db"))
+JOB_SPOOL_DIR = os.environ.get("JOB_SPOOL_DIR", os.path.join(BASE_DIR, "job_uploads"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+
+job_queue = JobQueue(JOB_DB_PATH, run_job, JOB_SPOOL_DIR, num_workers=JOB_WORKERS)
+
+
+def on_model_swap(version, previous):
+    """Start serving jobs once the first model is ready; drop cached results from other versions"""
+    # Also runs for the first model, so an index persisted by a different model is discarded
+    phash_index.set_model_version(version.version_id)
+    if previous is None:
+        job_queue.start()
+
+# Models are loaded and warmed up in the background; /readyz reports when serving can start
+registry = ModelRegistry(
+    warmup_batch_sizes=(1, batch_size_for_memory(SERIES_MAX_BATCH_MB)),
+    on_swap=on_model_swap
+)
+# Job workers start from on_model_swap, so they too only run in the serving process
+if IS_SERVING_PROCESS:
+    registry.load_async(MODEL_PATH, SCREEN_MODEL_PATH, CASCADE_THRESHOLD)
 
 @app.route('/')
 def home():
     return "🧠 Brain Tumor Detection API is Running!"
 
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    status = registry.status()
+    return jsonify(status), (200 if status['ready'] else 503)
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_model():
+    # Loads next to the serving model; requests keep using the old one until the swap.
+    # Only versions inside the configured MODEL_PATH directory can be chosen, never arbitrary paths
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled; set ADMIN_TOKEN'}), 403
+    # A custom header cannot be sent by a cross-origin form and needs a CORS preflight, which /admin/* fails
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 401
+
+    options = request.get_json(silent=True)
+    if not isinstance(options, dict):
+        options = {}
+    model_path = MODEL_PATH
+    if options.get('version') is not None:
+        if not isinstance(options['version'], str):
+            return jsonify({'error': 'version must be a string'}), 400
+        versions = list_versions(MODEL_PATH)
+        if options['version'] not in versions:
+            return jsonify({'error': f"Unknown model version '{options['version']}'",
+                            'available': sorted(versions)}), 400
+        model_path = versions[options['version']]
+
+    try:
+        version = registry.load(model_path, SCREEN_MODEL_PATH, CASCADE_THRESHOLD)
+        return jsonify({'status': 'ok', 'model': version.info()})
+    except Exception as e:
+        return jsonify({'error': str(e), 'model': registry.status()['model']}), 500
+
 @app.route('/predict', methods=['POST'])
 def predict():
-    if model is None:
-        return jsonify({'error': 'Model not loaded'}), 500
+    version = registry.current
+    if version is None:
+        return jsonify({'error': 'Model not ready'}), 503
     
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -40,24 +197,66 @@ def predict():
 
     try:
         img = Image.open(file.stream)
-        img = img.resize((224, 224))  # Ensure correct input size
-        img = img.convert('RGB')
+        return jsonify(analyze_image(img, version))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        img_array = np.array(img)
-        img_array = np.expand_dims(img_array, axis=0) / 255.0
+@app.route('/predict_series', methods=['POST'])
+def predict_series_route():
+    version = registry.current
+    if version is None:
+        return jsonify({'error': 'Model not ready'}), 503
 
-        # Perform prediction
-        prediction = model.predict(img_array)
-        predicted_class = CLASSES[np.argmax(prediction[0])]
-        confidence = float(np.max(prediction[0]) * 100)
-
-        return jsonify({
-            'prediction': predicted_class,
-            'confidence': round(confidence, 2)
-        })
-    
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    aggregate = request.form.get('aggregate', 'mean')
+    include_slices = request.form.get('include_slices', 'false').lower() == 'true'
+
+    try:
+        result = analyze_series(file.stream, version, aggregate, include_slices, file.filename)
+        return jsonify(result)
+
+    # Unreadable, oversized and empty series are client errors
+    except (ValueError, UnidentifiedImageError, Image.DecompressionBombError,
+            zipfile.BadZipFile, tarfile.TarError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    kind = request.form.get('kind', 'image')
+    if kind not in ('image', 'series'):
+        return jsonify({'error': f'Unknown job kind: {kind}'}), 400
+
+    # Patient details are stored with the job so reports can be regenerated later
+    metadata = {
+        key: request.form.get(key, '')
+        for key in ('patient_name', 'patient_age', 'patient_gender')
+    }
+
+    job_id = job_queue.submit(file.stream, kind=kind, filename=file.filename, metadata=metadata)
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
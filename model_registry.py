@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from preprocessing import IMAGE_SIZE
+from cascade import CascadeClassifier, DEFAULT_THRESHOLD
+
+MODEL_EXTENSIONS = ('.h5', '.keras')
+
+
+def _is_saved_model_dir(path):
+    return os.path.isfile(os.path.join(path, 'saved_model.pb'))
+
+
+def list_versions(path):
+    """Map version name to path for every model in a directory of model versions"""
+    if not os.path.isdir(path) or _is_saved_model_dir(path):
+        return {}
+
+    versions = {}
+    for name in os.listdir(path):
+        full_path = os.path.join(path, name)
+        if name.lower().endswith(MODEL_EXTENSIONS) or (os.path.isdir(full_path) and _is_saved_model_dir(full_path)):
+            versions[name] = full_path
+    return versions
+
+
+def resolve_model_path(path):
+    """Resolve a model file or a directory of model versions to a loadable path.
+
+    A directory that is itself a SavedModel is returned as is; otherwise the
+    most recently modified .h5/.keras file or SavedModel sub-directory wins.
+    """
+    if not os.path.isdir(path) or _is_saved_model_dir(path):
+        return path
+
+    candidates = list(list_versions(path).values())
+    if not candidates:
+        raise FileNotFoundError(f"No model versions found in {path}")
+    return max(candidates, key=os.path.getmtime)
+
+
+def _file_id(path):
+    return f"{os.path.abspath(path)}@{os.path.getmtime(path):.0f}"
+
+
+class ModelVersion:
+    """A loaded model (plus optional screening cascade) ready to serve predictions"""
+
+    def __init__(self, path, model, cascade=None, screen_path=None):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.model = model
+        self.cascade = cascade
+        self.loaded_at = time.time()
+        # Changes whenever anything that affects predictions does: weights, screening model or threshold
+        self.version_id = _file_id(path)
+        if cascade is not None:
+            self.version_id += f"+{_file_id(screen_path)}@{cascade.threshold}"
+
+    def predict(self, batch):
+        """Return (probabilities, escalated) for a preprocessed batch"""
+        if self.cascade is not None:
+            return self.cascade.predict(batch)
+        probs = self.model.predict(batch, verbose=0)
+        return probs, np.ones(len(batch), dtype=bool)
+
+    def warm_up(self, batch_sizes=(1,), rounds=2):
+        """Run dummy inferences so graph tracing happens before live traffic"""
+        for batch_size in batch_sizes:
+            dummy = np.zeros((batch_size, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32)
+            for _ in range(rounds):
+                self.model.predict(dummy, verbose=0)
+                if self.cascade is not None:
+                    self.cascade.screen_model.predict(dummy, verbose=0)
+
+    def info(self):
+        return {
+            'name': self.name,
+            'path': self.path,
+            'cascade': self.cascade is not None,
+            'loaded_at': self.loaded_at
+        }
+
+
+def load_version(path, screen_model_path=None, threshold=DEFAULT_THRESHOLD):
+    """Load a model (and optional screening model) from disk"""
+    resolved = resolve_model_path(path)
+    print(f" Loading model from {resolved}...")
+    model = tf.keras.models.load_model(resolved)
+
+    cascade = None
+    screen_resolved = None
+    if screen_model_path:
+        try:
+            print(" Loading screening model...")
+            screen_resolved = resolve_model_path(screen_model_path)
+            screen_model = tf.keras.models.load_model(screen_resolved)
+            cascade = CascadeClassifier(screen_model, model, threshold=threshold)
+            print(f" Cascade enabled (threshold={threshold})")
+        except Exception as e:
+            print(f" Error loading screening model, using full model only: {e}")
+
+    return ModelVersion(resolved, model, cascade, screen_resolved)
+
+
+class ModelRegistry:
+    """Holds the serving model version and swaps in new ones without downtime.
+
+    New versions are loaded and warmed up off to the side; only then is the
+    `current` reference replaced. Requests grab `current` once and keep using
+    that version, so in-flight work finishes on the model it started with.
+    """
+
+    def __init__(self, warmup_batch_sizes=(1,), on_swap=None):
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self.on_swap = on_swap
+        self._current = None
+        self._swap_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loading = False
+        self.last_error = None
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def ready(self):
+        return self._current is not None
+
+    def load(self, path, screen_model_path=None, threshold=DEFAULT_THRESHOLD):
+        """Load, warm up and atomically activate a model version"""
+        with self._load_lock:
+            self.loading = True
+            try:
+                version = load_version(path, screen_model_path, threshold)
+                version.warm_up(self.warmup_batch_sizes)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f" Error loading model: {e}")
+                raise
+            finally:
+                self.loading = False
+
+            with self._swap_lock:
+                previous, self._current = self._current, version
+            self.last_error = None
+            print(f" Model {version.name} ready")
+
+            if self.on_swap is not None:
+                self.on_swap(version, previous)
+            return version
+
+    def load_async(self, path, screen_model_path=None, threshold=DEFAULT_THRESHOLD):
+        """Load a version in a background thread; errors are kept in last_error"""
+        def _load():
+            try:
+                self.load(path, screen_model_path, threshold)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=_load, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        current = self._current
+        return {
+            'ready': current is not None,
+            'loading': self.loading,
+            'model': current.info() if current is not None else None,
+            'error': self.last_error
+        }
@@ -1,4 +1,3 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import nltk
@@ -6,8 +5,10 @@ from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import re
 
+from src.encoder_backends import get_encoder
+
 class NLPProcessor:
-    def __init__(self):
+    def __init__(self, encoder_backend=None):
         # Download required NLTK data
         try:
             nltk.data.find('tokenizers/punkt')
@@ -18,11 +19,11 @@ class NLPProcessor:
         except LookupError:
             nltk.download('stopwords')
         
-        # Load sentence transformer model
+        # Load sentence encoder (backend from argument or NLP_ENCODER_BACKEND)
         print("Loading NLP model...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.encoder = get_encoder(encoder_backend)
         self.stop_words = set(stopwords.words('english'))
-        print("NLP model loaded successfully!")
+        print(f"NLP model loaded successfully! (backend: {self.encoder.name})")
     
     def clean_text(self, text):
         """Clean and preprocess text"""
@@ -48,7 +49,11 @@ class NLPProcessor:
     
     def get_embedding(self, text):
         """Generate sentence embedding"""
-        return self.model.encode(text)
+        return self.encoder.encode(text)
+    
+    def get_embeddings(self, texts):
+        """Generate sentence embeddings for a list of texts in one encoder call"""
+        return self.encoder.encode(list(texts))
     
     def calculate_similarity(self, text1, text2):
         """Calculate cosine similarity between two texts"""
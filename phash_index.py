@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+# Side of the grayscale thumbnail used to confirm hash hits
+THUMB_SIZE = 16
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so dct2(x) = D @ x @ D.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    d = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    d[0] /= np.sqrt(2.0)
+    return d.astype(np.float32)
+
+
+_DCT = _dct_matrix(DCT_SIZE)
+
+# Number of set bits in every byte value, used when np.bitwise_count is unavailable
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def perceptual_hash(img):
+    """64-bit DCT perceptual hash of a PIL image.
+
+    Robust to re-encoding, JPEG quality changes and mild rescaling, so
+    re-exported copies of the same slice land within a few bits of each other.
+    """
+    gray = img.convert('L').resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float32)
+    low_freq = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+
+    # Compare against the median of the AC terms; the DC term only tracks brightness
+    median = np.median(low_freq.ravel()[1:])
+    bits = (low_freq > median).ravel()
+    return np.packbits(bits).view('>u8')[0].astype(np.uint64)
+
+
+def thumbnail(img):
+    """16x16 grayscale thumbnail used to confirm a hash hit.
+
+    Box resampling averages every source pixel into its cell, so a small
+    lesion still shifts its cell by a few grey levels, while re-encoding or
+    rescaling the same image moves cells by at most about 2.
+    """
+    gray = img.convert('L').resize((THUMB_SIZE, THUMB_SIZE), Image.BOX)
+    return np.asarray(gray, dtype=np.uint8)
+
+
+def hamming_distances(hashes, query):
+    """Hamming distance between a uint64 hash array and a single hash"""
+    xor = np.bitwise_xor(hashes, np.uint64(query))
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(xor)
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+class PHashIndex:
+    """Near-duplicate index mapping perceptual hashes to class probabilities.
+
+    The 64-bit hash only captures low-frequency structure and cannot see small
+    lesions, so it is used to find candidates; a hit is returned only if the
+    16x16 thumbnails also agree pixel by pixel within `confirm_tolerance`.
+    Each entry costs 8 bytes of hash, 256 bytes of thumbnail and one float32
+    per class (about 280 MB per million entries), stored in contiguous NumPy
+    arrays that grow by doubling.
+    """
+
+    def __init__(self, max_distance=-1, num_classes=4, confirm_tolerance=2, initial_capacity=1024):
+        self.max_distance = max_distance
+        self.num_classes = num_classes
+        self.confirm_tolerance = confirm_tolerance
+        # Entries are only valid for the model version that produced them
+        self.model_version = None
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # Bumped on every change so the autosave thread can skip unchanged indexes
+        self._changes = 0
+        self._saved_changes = 0
+        self._hashes = np.zeros(initial_capacity, dtype=np.uint64)
+        self._thumbs = np.zeros((initial_capacity, THUMB_SIZE, THUMB_SIZE), dtype=np.uint8)
+        self._probs = np.zeros((initial_capacity, num_classes), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def lookup(self, query, thumb, model_version):
+        """Return (probs, distance) of the closest confirmed entry within max_distance, or None"""
+        if self.max_distance < 0:
+            return None
+
+        # Arrays are only ever replaced, never shrunk in place, so a snapshot is safe to scan unlocked
+        with self._lock:
+            if model_version != self.model_version:
+                return None
+            hashes, thumbs, probs, size = self._hashes, self._thumbs, self._probs, self._size
+        if size == 0:
+            return None
+
+        distances = hamming_distances(hashes[:size], query)
+        candidates = np.nonzero(distances <= self.max_distance)[0]
+        for idx in candidates[np.argsort(distances[candidates], kind='stable')]:
+            diff = np.abs(thumbs[idx].astype(np.int16) - thumb.astype(np.int16)).max()
+            if diff <= self.confirm_tolerance:
+                return probs[idx].copy(), int(distances[idx])
+        return None
+
+    def add(self, query, thumb, probs, model_version):
+        """Store the class probabilities predicted for an image by model_version"""
+        with self._lock:
+            # A request that started on a previous model may finish after the swap
+            if model_version != self.model_version:
+                return
+            if self._size == len(self._hashes):
+                capacity = max(1, 2 * len(self._hashes))
+                self._hashes = self._grow(self._hashes, capacity)
+                self._thumbs = self._grow(self._thumbs, capacity)
+                self._probs = self._grow(self._probs, capacity)
+
+            self._hashes[self._size] = query
+            self._thumbs[self._size] = thumb
+            self._probs[self._size] = probs
+            self._size += 1
+            self._changes += 1
+
+    def _grow(self, array, capacity):
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def _clear(self):
+        self._hashes = np.zeros_like(self._hashes)
+        self._thumbs = np.zeros_like(self._thumbs)
+        self._probs = np.zeros_like(self._probs)
+        self._size = 0
+        self._changes += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._clear()
+
+    def set_model_version(self, model_version):
+        """Switch to a model version, dropping entries produced by any other"""
+        with self._lock:
+            if model_version != self.model_version:
+                self._clear()
+                self.model_version = model_version
+
+    def save(self, path):
+        """Write the index and the model version it belongs to to an .npz file"""
+        path = _npz_path(path)
+        with self._save_lock:
+            # Entries below _size are never modified in place, so the slices can be written unlocked
+            with self._lock:
+                size, changes = self._size, self._changes
+                arrays = {'hashes': self._hashes[:size], 'thumbs': self._thumbs[:size],
+                          'probs': self._probs[:size], 'model_version': str(self.model_version)}
+            # Write to a temporary file first so a crash mid-write never leaves a truncated index
+            with open(path + '.tmp', 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(path + '.tmp', path)
+            self._saved_changes = changes
+
+    def start_autosave(self, path, interval=60.0):
+        """Save to path every `interval` seconds when the index has changed.
+
+        atexit handlers do not run on SIGTERM (docker stop, systemd, gunicorn),
+        so this is what keeps a persisted index current in deployments.
+        """
+        def _autosave_loop():
+            while True:
+                time.sleep(interval)
+                if self._changes != self._saved_changes:
+                    try:
+                        self.save(path)
+                    except OSError as e:
+                        print(f" Error saving near-duplicate index: {e}")
+
+        thread = threading.Thread(target=_autosave_loop, name="phash-autosave", daemon=True)
+        thread.start()
+        return thread
+
+    def load(self, path):
+        """Replace the index contents with a file written by save()"""
+        path = _npz_path(path)
+        if not os.path.exists(path):
+            return
+        data = np.load(path)
+        if ('thumbs' not in data or 'model_version' not in data
+                or data['thumbs'].shape[1:] != (THUMB_SIZE, THUMB_SIZE)):
+            # Written by an older version with other thumbnails or no model tag; not safe to serve
+            return
+        with self._lock:
+            self._hashes = data['hashes'].astype(np.uint64)
+            self._thumbs = data['thumbs'].astype(np.uint8)
+            self._probs = data['probs'].astype(np.float32)
+            self._size = len(self._hashes)
+            self.model_version = str(data['model_version'])
+
+
+def _npz_path(path):
+    # np.savez appends .npz to names without it; load must look for the same file
+    return path if path.endswith('.npz') else path + '.npz'
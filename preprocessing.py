@@ -0,0 +1,40 @@
+import numpy as np
+from PIL import Image
+
+# Model input size and label order (alphabetical, as produced by flow_from_directory)
+IMAGE_SIZE = (224, 224)
+CLASSES = ['glioma_tumor', 'meningioma_tumor', 'no_tumor', 'pituitary_tumor']
+
+# Intensity window (percentiles) used to map 16-bit and float slices to 0-255
+WINDOW_PERCENTILES = (0.5, 99.5)
+
+
+def _to_8bit(img):
+    """Window a 16-bit/32-bit/float image to 8-bit; convert('RGB') would clip everything above 255"""
+    if not (img.mode.startswith('I;16') or img.mode in ('I', 'F')):
+        return img
+    pixels = np.asarray(img, dtype=np.float32)
+    low, high = np.percentile(pixels, WINDOW_PERCENTILES)
+    if high <= low:
+        high = low + 1
+    scaled = (np.clip(pixels, low, high) - low) * (255.0 / (high - low))
+    return Image.fromarray(np.round(scaled).astype(np.uint8), mode='L')
+
+
+def decode_image(img):
+    """Resize and convert a PIL image to a (224, 224, 3) uint8 array"""
+    img = _to_8bit(img)
+    img = img.resize(IMAGE_SIZE)
+    img = img.convert('RGB')
+    return np.asarray(img, dtype=np.uint8)
+
+
+def preprocess_image(img):
+    """Resize, convert and rescale a PIL image to a (224, 224, 3) float32 array"""
+    return decode_image(img).astype(np.float32) / 255.0
+
+
+def load_image(path):
+    """Open an image file from disk and preprocess it"""
+    with Image.open(path) as img:
+        return preprocess_image(img)
@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class ChatRequestBatcher:
+    """Thread-safe front end for a ChatbotEngine shared by every Streamlit session.
+
+    Identical queries (after clean_text) that are already in flight share one
+    computation, and distinct queries arriving within `max_wait_ms` of each
+    other are answered together with a single encoder call.
+    """
+
+    def __init__(self, engine, max_batch_size=16, max_wait_ms=5):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._cond = threading.Condition()
+        self._pending = []
+        self._inflight = {}
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="chat-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def get_response(self, user_query, timeout=None):
+        """Drop-in replacement for ChatbotEngine.get_response"""
+        key = self.engine.nlp.clean_text(user_query)
+
+        with self._cond:
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._pending.append((key, user_query))
+                self._cond.notify()
+
+        # Each session gets its own copy so callers can't mutate a shared dict
+        return dict(future.result(timeout))
+
+    def _next_batch(self):
+        """Wait for work, then collect up to max_batch_size queries within the wait window"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            return batch
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                responses = self.engine.get_responses([query for _, query in batch])
+                error = None
+            except Exception as e:
+                responses, error = [None] * len(batch), e
+
+            for (key, _), response in zip(batch, responses):
+                # Remove before resolving so later arrivals start a fresh computation
+                with self._cond:
+                    future = self._inflight.pop(key)
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(response)
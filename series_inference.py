@@ -0,0 +1,205 @@
+import argparse
+import io
+import os
+import tarfile
+import zipfile
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from preprocessing import IMAGE_SIZE, CLASSES, preprocess_image
+
+SLICE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+
+# Tar members are read into memory (stream mode cannot seek); larger ones are rejected
+MAX_TAR_MEMBER_BYTES = 64 * 1024 * 1024
+
+# Bytes held by one preprocessed slice in the batch buffer
+SLICE_BYTES = IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3 * np.dtype(np.float32).itemsize
+
+
+def batch_size_for_memory(max_batch_mb, max_batch_size=64):
+    """Largest batch whose input buffer fits in max_batch_mb megabytes"""
+    fit = int(max_batch_mb * 1024 * 1024 // SLICE_BYTES)
+    return max(1, min(max_batch_size, fit))
+
+
+def _is_slice(name):
+    return name.lower().endswith(SLICE_EXTENSIONS) and not os.path.basename(name).startswith('.')
+
+
+def _iter_directory(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if _is_slice(name):
+                full_path = os.path.join(root, name)
+                with Image.open(full_path) as img:
+                    yield os.path.relpath(full_path, path), img
+
+
+def _iter_zip(fileobj):
+    with zipfile.ZipFile(fileobj) as zf:
+        members = sorted(i.filename for i in zf.infolist() if not i.is_dir() and _is_slice(i.filename))
+        for name in members:
+            # Decompressed lazily as PIL reads it, never whole into memory
+            with zf.open(name) as member, Image.open(member) as img:
+                yield name, img
+
+
+def _iter_tar(fileobj):
+    # Stream mode reads members in archive order without seeking back
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and _is_slice(member.name):
+                if member.size > MAX_TAR_MEMBER_BYTES:
+                    raise ValueError(f"{member.name} is larger than {MAX_TAR_MEMBER_BYTES // (1024 * 1024)} MB")
+                data = archive.extractfile(member).read()
+                with Image.open(io.BytesIO(data)) as img:
+                    yield member.name, img
+
+
+def _iter_frames(fileobj, name):
+    with Image.open(fileobj) as img:
+        for i, frame in enumerate(ImageSequence.Iterator(img)):
+            yield f"{name}[{i}]", frame
+
+
+def iter_slices(source, name='series'):
+    """Yield (slice_name, PIL image) one slice at a time.
+
+    `source` may be a directory path, a zip/tar archive (path or seekable file
+    object) or a multi-frame image such as a TIFF stack. Images are only valid
+    until the next slice is requested.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if os.path.isdir(source):
+            yield from _iter_directory(source)
+            return
+        name = os.path.basename(source)
+        with open(source, 'rb') as f:
+            yield from iter_slices(f, name)
+        return
+
+    if zipfile.is_zipfile(source):
+        source.seek(0)
+        yield from _iter_zip(source)
+        return
+
+    source.seek(0)
+    try:
+        with tarfile.open(fileobj=source, mode='r:*'):
+            is_tar = True
+    except tarfile.TarError:
+        is_tar = False
+    source.seek(0)
+
+    if is_tar:
+        yield from _iter_tar(source)
+    else:
+        yield from _iter_frames(source, name)
+
+
+class SeriesAggregator:
+    """Accumulate per-slice probabilities into a study-level result"""
+
+    def __init__(self, method='mean', keep_slices=True):
+        if method not in ('mean', 'max'):
+            raise ValueError(f"Unknown aggregation method: {method}")
+        self.method = method
+        self.keep_slices = keep_slices
+        self.count = 0
+        self.prob_sum = np.zeros(len(CLASSES), dtype=np.float64)
+        self.prob_max = np.zeros(len(CLASSES), dtype=np.float64)
+        self.votes = np.zeros(len(CLASSES), dtype=np.int64)
+        self.slices = []
+
+    def update(self, names, probs):
+        """Add a batch of slice probabilities"""
+        self.count += len(probs)
+        self.prob_sum += probs.sum(axis=0)
+        self.prob_max = np.maximum(self.prob_max, probs.max(axis=0))
+        self.votes += np.bincount(probs.argmax(axis=1), minlength=len(CLASSES))
+
+        if self.keep_slices:
+            for name, p in zip(names, probs):
+                self.slices.append({
+                    'slice': name,
+                    'prediction': CLASSES[int(np.argmax(p))],
+                    'confidence': round(float(np.max(p) * 100), 2)
+                })
+
+    def result(self):
+        """Return the study-level prediction as a JSON-serialisable dict"""
+        if self.count == 0:
+            raise ValueError("No image slices found in series")
+
+        if self.method == 'mean':
+            study_probs = self.prob_sum / self.count
+        else:
+            study_probs = self.prob_max / self.prob_max.sum()
+
+        result = {
+            'prediction': CLASSES[int(np.argmax(study_probs))],
+            'confidence': round(float(np.max(study_probs) * 100), 2),
+            'aggregation': self.method,
+            'num_slices': self.count,
+            'all_predictions': {c: round(float(p * 100), 2) for c, p in zip(CLASSES, study_probs)},
+            'slice_votes': {c: int(v) for c, v in zip(CLASSES, self.votes)}
+        }
+        if self.keep_slices:
+            result['slices'] = self.slices
+        return result
+
+
+def predict_series(source, predict_fn, batch_size=16, aggregate='mean', keep_slices=True, name='series'):
+    """Run batched inference over a series and aggregate to a study-level result.
+
+    Slices are decoded and preprocessed one at a time into a single reusable
+    batch buffer, so memory stays bounded by `batch_size` regardless of how
+    many slices the study contains. `predict_fn` maps a (n, 224, 224, 3) batch
+    to (n, num_classes) probabilities.
+    """
+    aggregator = SeriesAggregator(method=aggregate, keep_slices=keep_slices)
+    buffer = np.empty((batch_size, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32)
+    names = []
+
+    for slice_name, img in iter_slices(source, name):
+        buffer[len(names)] = preprocess_image(img)
+        names.append(slice_name)
+
+        if len(names) == batch_size:
+            aggregator.update(names, np.asarray(predict_fn(buffer)))
+            names = []
+
+    if names:
+        aggregator.update(names, np.asarray(predict_fn(buffer[:len(names)])))
+
+    return aggregator.result()
+
+
+def main():
+    import tensorflow as tf
+
+    parser = argparse.ArgumentParser(description="Study-level prediction over a multi-slice MRI series")
+    parser.add_argument('source', help="Directory, zip/tar archive or multi-frame image")
+    parser.add_argument('--model', required=True, help="Path to the Keras model")
+    parser.add_argument('--max-batch-mb', type=float, default=64,
+                        help="Memory ceiling for the input batch buffer")
+    parser.add_argument('--aggregate', choices=['mean', 'max'], default='mean')
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    batch_size = batch_size_for_memory(args.max_batch_mb)
+    result = predict_series(args.source, lambda b: model.predict(b, verbose=0),
+                            batch_size=batch_size, aggregate=args.aggregate, keep_slices=False)
+
+    print(f"Slices     : {result['num_slices']}")
+    print(f"Prediction : {result['prediction']}")
+    print(f"Confidence : {result['confidence']}%")
+    for cls, prob in result['all_predictions'].items():
+        print(f"  {cls:<18} {prob:6.2f}%  ({result['slice_votes'][cls]} slices)")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.chatbot_engine import ChatbotEngine
+from src.request_batcher import ChatRequestBatcher
 import requests
 from PIL import Image
 import io
@@ -15,6 +16,9 @@ from reportlab.lib.colors import HexColor # pyright: ignore[reportMissingModuleS
 from reportlab.lib.units import mm # pyright: ignore[reportMissingModuleSource]
 from datetime import datetime
 
+# Flask backend serving predictions and the analysis job queue
+BACKEND_URL = "http://localhost:5000"
+
 # Page configuration
 st.set_page_config(
     page_title="Brain Tumor Medical Assistant",
@@ -310,12 +314,17 @@ def generate_pdf_report(patient_name, patient_age, patient_gender, tumor_type_ra
 
 @st.cache_resource
 def load_chatbot():
-    return ChatbotEngine(similarity_threshold=0.4)
+    # Shared by every session: coalesce identical queries and micro-batch the rest
+    return ChatRequestBatcher(ChatbotEngine(similarity_threshold=0.4))
 
 # Initialize session state
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 
+if 'mri_jobs' not in st.session_state:
+    st.session_state.mri_jobs = []
+    st.session_state.announced_jobs = set()
+
 if 'chatbot_loaded' not in st.session_state:
     with st.spinner("🔄 Loading AI models... This may take a minute on first run."):
         st.session_state.chatbot = load_chatbot()
@@ -482,92 +491,44 @@ with tab2:
     with col2:
         if uploaded_file:
             if st.button("🔍 Analyze MRI Scan", use_container_width=True, type="primary"):
-                with st.spinner("🧠 Analyzing brain MRI... Please wait..."):
-                    try:
-                        # Prepare image
-                        image = Image.open(uploaded_file)
-                        
-                        # Convert to bytes
-                        img_byte_arr = io.BytesIO()
-                        image.save(img_byte_arr, format='PNG')
-                        img_byte_arr.seek(0)
-                        
-                        # Send to Flask backend
-                        files = {'file': ('image.png', img_byte_arr, 'image/png')}
-                        response = requests.post('http://localhost:5000/predict', files=files, timeout=30)
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            prediction = result.get('prediction', 'Unknown')
-                            confidence = result.get('confidence', 0)
-                            
-                            # Display result
-                            st.success("✅ Analysis Complete!")
-                            
-                            # Prediction result
-                            st.metric(label="🎯 Detected Condition", value=prediction.upper())
-                            st.metric(label="📊 Confidence Level", value=f"{confidence}%")
-                            
-                            # All predictions (if available)
-                            if 'all_predictions' in result:
-                                st.subheader("📈 Detailed Probabilities")
-                                all_preds = result['all_predictions']
-                                for tumor_type, prob in sorted(all_preds.items(), key=lambda x: x[1], reverse=True):
-                                    st.progress(prob / 100, text=f"{tumor_type.upper()}: {prob:.2f}%")
-                            
-                            # PDF report generation
-                            pdf_buffer = generate_pdf_report(
-                                patient_name=patient_name,
-                                patient_age=patient_age,
-                                patient_gender=patient_gender,
-                                tumor_type_raw=prediction,
-                                confidence=confidence
-                            )
-
-                            st.download_button(
-                                label="📄 Download PDF Report",
-                                data=pdf_buffer,
-                                file_name="Brain_MRI_Report.pdf",
-                                mime="application/pdf",
-                                use_container_width=True
-                            )
-                            
-                            # Add to chat history
-                            bot_response = {
-                                'answer': (
-                                    f"🔬 **MRI Analysis Complete**\n\n"
-                                    f"**Detected:** {prediction.upper()}\n"
-                                    f"**Confidence:** {confidence}%\n\n"
-                                    f"⚕️ Please consult a radiologist or neurologist for professional interpretation "
-                                    f"and treatment planning."
-                                ),
-                                'confidence': confidence,
-                                'category': 'mri_analysis',
-                                'matched': True
-                            }
-                            st.session_state.chat_history.append({
-                                "role": "assistant",
-                                "content": bot_response
-                            })
-                            
-                            st.info("💬 Result added to chat history!")
-                        
-                        else:
-                            st.error(f"❌ Error: Server returned status code {response.status_code}")
-                            st.error(response.text)
-                    
-                    except requests.exceptions.ConnectionError:
-                        st.error("❌ **Cannot connect to prediction server!**")
-                        st.warning("""
-                        **Please make sure:**
-                        1. Flask backend is running: `python backend/main.py`
-                        2. Server is accessible at `http://localhost:5000`
-                        3. Check firewall settings
-                        """)
-                    
-                    except Exception as e:
-                        st.error(f"❌ **Error during analysis:** {str(e)}")
-                        st.info("Check console for detailed error information")
+                try:
+                    # Prepare image
+                    image = Image.open(uploaded_file)
+
+                    # Convert to bytes
+                    img_byte_arr = io.BytesIO()
+                    image.save(img_byte_arr, format='PNG')
+                    img_byte_arr.seek(0)
+
+                    # Queue the scan on the Flask backend; results are fetched below
+                    files = {'file': (uploaded_file.name, img_byte_arr, 'image/png')}
+                    data = {
+                        'patient_name': patient_name,
+                        'patient_age': patient_age,
+                        'patient_gender': patient_gender
+                    }
+                    response = requests.post(f'{BACKEND_URL}/jobs', files=files, data=data, timeout=10)
+
+                    if response.status_code == 202:
+                        job_id = response.json()['job_id']
+                        st.session_state.mri_jobs.insert(0, job_id)
+                        st.success("✅ Scan submitted! The result will appear under **My Analyses** below.")
+                    else:
+                        st.error(f"❌ Error: Server returned status code {response.status_code}")
+                        st.error(response.text)
+
+                except requests.exceptions.ConnectionError:
+                    st.error("❌ **Cannot connect to prediction server!**")
+                    st.warning("""
+                    **Please make sure:**
+                    1. Flask backend is running: `python backend/main.py`
+                    2. Server is accessible at `http://localhost:5000`
+                    3. Check firewall settings
+                    """)
+
+                except Exception as e:
+                    st.error(f"❌ **Error submitting scan:** {str(e)}")
+                    st.info("Check console for detailed error information")
         else:
             st.info("👆 Upload an MRI scan to begin analysis")
             
@@ -589,6 +550,97 @@ with tab2:
                 - No Tumor (Normal)
                 """)
 
+    # Submitted analyses (results are stored by the backend, so no re-inference is needed)
+    if st.session_state.mri_jobs:
+        st.markdown("---")
+        header_col, refresh_col = st.columns([5, 1])
+        with header_col:
+            st.markdown("### 🗂️ My Analyses")
+        with refresh_col:
+            if st.button("🔄 Refresh", use_container_width=True):
+                st.rerun()
+
+        for job_id in st.session_state.mri_jobs:
+            try:
+                job_response = requests.get(f'{BACKEND_URL}/jobs/{job_id}', timeout=5)
+                job = job_response.json() if job_response.status_code == 200 else None
+            except requests.exceptions.ConnectionError:
+                st.error("❌ **Cannot connect to prediction server!**")
+                break
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # Timeouts and malformed responses only affect this job, not the rest of the page
+                st.warning(f"⚠️ Could not load job {job_id[:8]}: {e}")
+                continue
+
+            if job is None:
+                st.warning(f"⚠️ Job {job_id[:8]} not found on server")
+                continue
+
+            title = f"📁 {job.get('filename') or 'MRI scan'} — {job['status'].upper()}"
+
+            with st.expander(title, expanded=job['status'] == 'done'):
+                if job['status'] in ('queued', 'running'):
+                    st.info("⏳ Analysis in progress... press Refresh to update.")
+                    continue
+                if job['status'] == 'error':
+                    st.error(f"❌ **Error during analysis:** {job.get('error')}")
+                    continue
+
+                result = job['result']
+                meta = job.get('metadata', {})
+                prediction = result.get('prediction', 'Unknown')
+                confidence = result.get('confidence', 0)
+
+                # Prediction result
+                st.metric(label="🎯 Detected Condition", value=prediction.upper())
+                st.metric(label="📊 Confidence Level", value=f"{confidence}%")
+
+                # All predictions (if available)
+                if 'all_predictions' in result:
+                    st.subheader("📈 Detailed Probabilities")
+                    all_preds = result['all_predictions']
+                    for tumor_type, prob in sorted(all_preds.items(), key=lambda x: x[1], reverse=True):
+                        st.progress(prob / 100, text=f"{tumor_type.upper()}: {prob:.2f}%")
+
+                # PDF report regenerated from the stored record
+                pdf_buffer = generate_pdf_report(
+                    patient_name=meta.get('patient_name'),
+                    patient_age=meta.get('patient_age'),
+                    patient_gender=meta.get('patient_gender'),
+                    tumor_type_raw=prediction,
+                    confidence=confidence
+                )
+
+                st.download_button(
+                    label="📄 Download PDF Report",
+                    data=pdf_buffer,
+                    file_name="Brain_MRI_Report.pdf",
+                    mime="application/pdf",
+                    use_container_width=True,
+                    key=f"pdf_{job_id}"
+                )
+
+                # Add to chat history the first time the result is seen
+                if job_id not in st.session_state.announced_jobs:
+                    st.session_state.announced_jobs.add(job_id)
+                    bot_response = {
+                        'answer': (
+                            f"🔬 **MRI Analysis Complete**\n\n"
+                            f"**Detected:** {prediction.upper()}\n"
+                            f"**Confidence:** {confidence}%\n\n"
+                            f"⚕️ Please consult a radiologist or neurologist for professional interpretation "
+                            f"and treatment planning."
+                        ),
+                        'confidence': confidence,
+                        'category': 'mri_analysis',
+                        'matched': True
+                    }
+                    st.session_state.chat_history.append({
+                        "role": "assistant",
+                        "content": bot_response
+                    })
+                    st.info("💬 Result added to chat history!")
+
 # Footer
 st.divider()
 st.markdown("""
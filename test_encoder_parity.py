@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+
+# Never reach the network: a baseline model that is not cached locally skips the test
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.encoder_backends import DEFAULT_ONNX_DIR, ONNX_MODEL_FILE
+
+KB_PATH = os.environ.get('KB_PATH', 'data/knowledge_base.json')
+MIN_AGREEMENT = 0.95
+
+
+@unittest.skipUnless(os.path.exists(os.path.join(DEFAULT_ONNX_DIR, ONNX_MODEL_FILE)),
+                     "ONNX encoder not exported; run `python encoder_backends.py export`")
+class EncoderParityTest(unittest.TestCase):
+    """The int8 ONNX encoder must retrieve the same knowledge base answers as the default backend"""
+
+    def test_top1_agreement(self):
+        from src.encoder_backends import OnnxInt8Encoder, SentenceTransformerEncoder
+        from src.compare_encoders import build_queries, top1_matches
+        from src.knowledge_base_manager import KnowledgeBaseManager
+
+        questions = KnowledgeBaseManager(KB_PATH).get_all_questions()
+        if not questions:
+            self.skipTest(f"Knowledge base not found at {KB_PATH}")
+        try:
+            baseline = SentenceTransformerEncoder()
+        except Exception as e:
+            self.skipTest(f"Baseline encoder not available offline: {e}")
+        candidate = OnnxInt8Encoder()
+
+        queries = build_queries(questions)
+        base_ids, _ = top1_matches(baseline, questions, queries)
+        cand_ids, _ = top1_matches(candidate, questions, queries)
+
+        agreement = sum(a == b for a, b in zip(base_ids, cand_ids)) / len(queries)
+        self.assertGreaterEqual(agreement, MIN_AGREEMENT)
+
+
+if __name__ == "__main__":
+    unittest.main()